@@ -2,104 +2,540 @@
 Здесь прописан парсинг PDF, TXT, Docx, Markdown, PPTx
 """
 
-from langchain_community.document_loaders import (UnstructuredFileLoader, UnstructuredMarkdownLoader,
-                                                  UnstructuredPowerPointLoader,
-                                                  UnstructuredWordDocumentLoader, UnstructuredPDFLoader)
+from langchain_community.document_loaders import (UnstructuredMarkdownLoader, UnstructuredPowerPointLoader,
+                                                  UnstructuredWordDocumentLoader)
+from langchain_community.document_loaders.base import BaseLoader
+
+from PIL import Image
+import fitz  # PyMuPDF
+import pytesseract
+
+import asyncio
+import functools
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
+import pickle
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
 
 from pathlib import Path
 from langchain.schema import Document
 from tqdm import tqdm
 
-def get_document_loader(document_path: str | Path, mode: str = 'single',
-                        include_page_breaks: bool = False) -> UnstructuredFileLoader | Exception:
+
+def _get_parse_workers() -> int:
+    """
+    Возвращает кол-во процессов для параллельного парсинга.
+    Берётся из переменной окружения PARSE_WORKERS, по умолчанию cpu_count() - 1
+    """
+    default = (os.cpu_count() or 2) - 1
+    return max(1, int(os.environ.get("PARSE_WORKERS", default)))
+
+
+# Если в текстовом слое страницы PDF меньше символов - считаем её сканом и распознаём через OCR
+MIN_CHARS_PER_PAGE = 50
+
+# DPI растеризации страниц для OCR. 200 вместо обычных 300 - в ~2 раза меньше пикселей при сопоставимом качестве
+OCR_DPI = 200
+
+# Стратегия PDFLoader для сканов: Tesseract напрямую по растеризованным страницам.
+# Любое другое значение ('auto', 'ocr_only', 'hi_res', ...) - стратегия partition_pdf из Unstructured
+TESSERACT_STRATEGY = 'tesseract'
+
+# С какого кол-ва страниц PDF имеет смысл распознавать постранично в несколько процессов
+PARALLEL_MIN_PAGES = 5
+
+
+def _page_to_pdf(pdf: fitz.Document, index: int) -> bytes:
+    """Вырезает страницу в отдельный одностраничный PDF в памяти"""
+    with fitz.open() as single:
+        single.insert_pdf(pdf, from_page=index, to_page=index)
+        return single.tobytes()
+
+
+def _ocr_pdf(data: bytes, languages: list[str], strategy: str = 'ocr_only', **unstructured_kwargs) -> list[str]:
+    """OCR PDF из памяти через Unstructured. Возвращает текст по страницам"""
+    # Тяжёлый импорт (модели layout), нужен только для стратегий Unstructured - не тянем его в каждый процесс
+    from unstructured.partition.pdf import partition_pdf
+
+    elements = partition_pdf(file=io.BytesIO(data), strategy=strategy, languages=languages, **unstructured_kwargs)
+
+    pages: dict[int, list[str]] = {}
+    for el in elements:
+        pages.setdefault(el.metadata.page_number or 1, []).append(str(el))
+
+    page_count = max(pages, default=0)
+    return ["\n\n".join(pages.get(i, [])) for i in range(1, page_count + 1)]
+
+
+def _ocr_pdf_page(page: fitz.Page, languages: list[str], dpi: int = OCR_DPI) -> str:
+    """OCR страницы Tesseract'ом: растеризуем сразу в 8-битных оттенках серого и с пониженным DPI"""
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(img, lang="+".join(languages))
+
+
+def _ocr_page(page_data: bytes, languages: list[str], dpi: int = OCR_DPI) -> str:
+    """OCR одной страницы (одностраничный PDF в памяти)"""
+    with fitz.open(stream=page_data, filetype="pdf") as pdf:
+        return _ocr_pdf_page(pdf.load_page(0), languages=languages, dpi=dpi)
+
+
+def _default_page_workers() -> int:
+    """
+    Кол-во процессов для постраничного OCR по умолчанию.
+    Внутри дочернего процесса (например, пула parse_documents_in_dir) - 1, чтобы не плодить вложенные пулы
+    размером cpu_count() в каждом воркере
+    """
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return os.cpu_count() or 1
+
+
+class PDFLoader(BaseLoader):
+    """
+    Загрузчик PDF.
+    Текстовый слой читается через PyMuPDF (в разы быстрее), страницы-сканы - через Tesseract
+    по растеризованным в оттенках серого страницам (или через Unstructured, если задана его стратегия).
+    Файл читается с диска один раз, дальше все парсеры работают с байтами в памяти
+    """
+
+    def __init__(self, file_path: str | Path, mode: str = 'paged', strategy: str = TESSERACT_STRATEGY,
+                 languages: list[str] | None = None, include_page_breaks: bool = False,
+                 page_workers: int | None = None, ocr_dpi: int = OCR_DPI, **unstructured_kwargs):
+        """
+        file_path - путь к PDF
+        mode - режим парсинга ('single' - один Document на файл, иначе Document на страницу)
+        strategy - стратегия для сканов: TESSERACT_STRATEGY - Tesseract напрямую, иначе стратегия Unstructured
+        languages - языки для OCR
+        include_page_breaks - разделять ли страницы символом разрыва страницы в режиме 'single'
+        page_workers - кол-во процессов для постраничного OCR больших PDF
+                       (по умолчанию cpu_count(), внутри дочернего процесса - 1)
+        ocr_dpi - DPI растеризации страниц для OCR
+        unstructured_kwargs - аргументы partition_pdf (таблицы по умолчанию не распознаются)
+        """
+        self.file_path = Path(file_path)
+        self.mode = mode
+        self.strategy = strategy
+        self.languages = languages or ['rus', 'eng']
+        self.include_page_breaks = include_page_breaks
+        self.page_workers = page_workers or _default_page_workers()
+        self.ocr_dpi = ocr_dpi
+        self.unstructured_kwargs = {"pdf_infer_table_structure": False, **unstructured_kwargs}
+
+    def _is_scanned(self, text: str) -> bool:
+        """Страница без текстового слоя (или почти без него) считается сканом"""
+        return len(text.strip()) < MIN_CHARS_PER_PAGE
+
+    def _iter_pages_unstructured(self, pdf: fitz.Document) -> Iterator[str]:
+        """Текст страниц, сканы распознаются одним вызовом partition_pdf (поэтому все страницы собираются сразу)"""
+        pages = [page.get_text("text") for page in pdf]
+        scanned = [i for i, text in enumerate(pages) if self._is_scanned(text)]
+        if scanned:
+            pdf.select(scanned)  # документ открыт из памяти, файл на диске не меняется
+            texts = _ocr_pdf(pdf.tobytes(),
+                             languages=self.languages,
+                             strategy=self.strategy,
+                             metadata_filename=self.file_path.name,
+                             **self.unstructured_kwargs)
+            for i, text in zip(scanned, texts):
+                pages[i] = text
+        yield from pages
+
+    def _iter_pages_parallel(self, pdf: fitz.Document) -> Iterator[str]:
+        """Текст страниц с OCR сканов в пуле процессов. Страницы отдаются по порядку, как только готовы"""
+        pool = ProcessPoolExecutor(max_workers=self.page_workers)
+        try:
+            pending: deque[str | Future] = deque()
+            for i, page in enumerate(pdf):
+                text = page.get_text("text")
+                if self._is_scanned(text):
+                    # В процесс отдаём только байты страницы, а не весь файл
+                    pending.append(pool.submit(_ocr_page, _page_to_pdf(pdf, i),
+                                               languages=self.languages, dpi=self.ocr_dpi))
+                else:
+                    pending.append(text)
+
+                while pending and (isinstance(pending[0], str) or pending[0].done()):
+                    head = pending.popleft()
+                    yield head if isinstance(head, str) else head.result()
+
+            for head in pending:
+                yield head if isinstance(head, str) else head.result()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _iter_pages(self, data: bytes) -> Iterator[str]:
+        """
+        Текст страниц по порядку, по мере готовности.
+        Решение "цифровая страница или скан" принимается по каждой странице отдельно:
+        в смешанных PDF сканированные страницы иначе остались бы пустыми.
+        Текстовый слой читается последовательно: PyMuPDF не поддерживает многопоточность
+        """
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            if self.strategy != TESSERACT_STRATEGY:
+                yield from self._iter_pages_unstructured(pdf)
+            elif self.page_workers > 1 and pdf.page_count >= PARALLEL_MIN_PAGES:
+                yield from self._iter_pages_parallel(pdf)
+            else:
+                for page in pdf:
+                    text = page.get_text("text")
+                    yield _ocr_pdf_page(page, languages=self.languages, dpi=self.ocr_dpi) \
+                        if self._is_scanned(text) else text
+
+    def _pages_to_documents(self, pages: Iterable[str]) -> Iterator[Document]:
+        """Оборачивает текст страниц в Document в соответствии с mode"""
+        source = self.file_path.as_posix()
+
+        if self.mode == 'single':
+            separator = "\n\f" if self.include_page_breaks else "\n\n"
+            yield Document(page_content=separator.join(pages), metadata={"source": source})
+            return
+
+        for i, text in enumerate(pages, start=1):
+            yield Document(page_content=text, metadata={"source": source, "page_number": i})
+
+    def load(self) -> list[Document]:
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        # Один последовательный read() вместо множества мелких чтений парсерами
+        data = self.file_path.read_bytes()
+        yield from self._pages_to_documents(self._iter_pages(data))
+
+
+# Режим парсинга по умолчанию: Document на страницу. Для RAG документ всё равно режется на куски,
+# поэтому склейка всего файла в один Document ('single') - лишняя работа и память
+DEFAULT_MODE = 'paged'
+
+# Загрузчик по расширению файла (в нижнем регистре)
+_LOADERS: dict[str, type[BaseLoader]] = {
+    ".pdf": PDFLoader,  # для сканов без текстового слоя - OCR
+    ".docx": UnstructuredWordDocumentLoader,
+    ".md": UnstructuredMarkdownLoader,
+    ".pptx": UnstructuredPowerPointLoader,
+}
+
+# Расширения, для которых есть загрузчик в get_document_loader
+SUPPORTED_EXTENSIONS = frozenset(_LOADERS)
+
+
+def _iter_document_files(dir_path: Path, recursive: bool = True) -> Iterator[Path]:
+    """
+    Обход директории через os.scandir: отдаёт только файлы поддерживаемых форматов.
+    Path создаётся только для подходящих файлов, остальные записи отсекаются по имени.
+    Недоступные директории (нет прав и т.п.) пропускаются, обход продолжается
+    """
+    try:
+        entries = os.scandir(dir_path)
+    except OSError as e:
+        print(f'{dir_path} пропущена: {e}')
+        return
+
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from _iter_document_files(Path(entry.path), recursive)
+            elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS and entry.is_file():
+                yield Path(entry.path)
+
+
+def get_document_loader(document_path: str | Path, mode: str = DEFAULT_MODE,
+                        include_page_breaks: bool = False,
+                        pdf_strategy: str = TESSERACT_STRATEGY,
+                        ocr_dpi: int = OCR_DPI) -> BaseLoader | Exception:
     """
     document_path - путь к документу
-    mode - режим парсинга
+    mode - режим парсинга ('paged' - по страницам, 'single' - один объект, 'elements' - по элементам)
     include_page_breaks - включает ли склейку страниц
+    pdf_strategy - как распознавать страницы-сканы в PDF: TESSERACT_STRATEGY ('tesseract') - Tesseract напрямую
+                   (быстро, без распознавания таблиц), либо стратегия Unstructured ('auto', 'ocr_only', 'hi_res')
+                   со смыслом как в partition_pdf. Для остальных форматов всегда используется 'auto' Unstructured
+    ocr_dpi - DPI растеризации страниц PDF для OCR Tesseract (для остальных форматов не используется)
 
     Возвращает парсер документа
     """
 
     document_path = Path(document_path)
 
-    match document_path.suffix:
-        case ".pdf":
-            return UnstructuredPDFLoader(document_path.as_posix(),
-                                         mode=mode,  # чтобы возвращалось как один объект
-                                         strategy='auto',  # чтобы и сканы и обычные пдф читать
-                                         languages=['rus', 'eng'],
-                                         include_page_breaks=include_page_breaks)  # склейка страниц
-        case ".docx":
-            return UnstructuredWordDocumentLoader(document_path.as_posix(),
-                                                  mode=mode,
-                                                  strategy='auto',
-                                                  languages=['rus', 'eng'],
-                                                  include_page_breaks=include_page_breaks)
-        case ".md":
-            return UnstructuredMarkdownLoader(document_path.as_posix(),
-                                              mode=mode,
-                                              strategy='auto',
-                                              languages=['rus', 'eng'],
-                                              include_page_breaks=include_page_breaks)
-        case ".pptx":
-            return UnstructuredPowerPointLoader(document_path.as_posix(),
-                                                mode=mode,
-                                                strategy='auto',
-                                                languages=['rus', 'eng'],
-                                                include_page_breaks=include_page_breaks)
-        case _:
-            return Exception(f"Неподдерживаемый формат файла: {document_path.suffix}")
-
-
-def parse_document(document_path: str | Path, **kwargs) -> list[Document] | Exception:
+    loader_cls = _LOADERS.get(document_path.suffix.lower())
+    if loader_cls is None:
+        return Exception(f"Неподдерживаемый формат файла: {document_path.suffix}")
+
+    if loader_cls is PDFLoader:
+        return PDFLoader(document_path.as_posix(),
+                         mode=mode,
+                         strategy=pdf_strategy,
+                         languages=['rus', 'eng'],
+                         include_page_breaks=include_page_breaks,
+                         ocr_dpi=ocr_dpi)
+
+    return loader_cls(document_path.as_posix(),
+                      mode=mode,
+                      strategy='auto',
+                      languages=['rus', 'eng'],
+                      include_page_breaks=include_page_breaks)  # склейка страниц
+
+
+# Каталог кэша распарсенных документов, можно переопределить через RAGNESTIOR_CACHE_DIR
+CACHE_DIR = Path(os.environ.get("RAGNESTIOR_CACHE_DIR", Path.home() / ".cache" / "ragnestior")) / "parsed"
+
+# Сколько байт с начала и с конца файла участвует в хэше
+_HASH_EDGE_BYTES = 1024 * 1024
+
+
+def _file_hash(path: Path, **loader_kwargs) -> str:
+    """
+    Быстрый хэш содержимого файла: размер + первый и последний мегабайт.
+    Не зависит от имени и расположения файла, поэтому переименование не вызывает повторный парсинг.
+    Параметры загрузчика тоже входят в ключ, т.к. от них зависит результат
+    """
+    size = path.stat().st_size
+    h = hashlib.sha256(str(size).encode())
+
+    with open(path, 'rb') as f:
+        h.update(f.read(_HASH_EDGE_BYTES))
+        if size > 2 * _HASH_EDGE_BYTES:
+            f.seek(-_HASH_EDGE_BYTES, os.SEEK_END)
+            h.update(f.read(_HASH_EDGE_BYTES))
+        elif size > _HASH_EDGE_BYTES:
+            h.update(f.read())
+
+    h.update(repr(sorted(loader_kwargs.items())).encode())
+    return h.hexdigest()
+
+
+def _load_cached(cache_path: Path, ttl_secs: float | None) -> list[Document] | None:
+    """
+    Возвращает документы из кэша, либо None, если кэша нет, он устарел или не читается.
+    Нечитаемая запись (битый файл, pickle от другой версии langchain и т.п.) считается промахом
+    и перезаписывается после парсинга
+    """
+    try:
+        if ttl_secs is not None and time.time() - cache_path.stat().st_mtime > ttl_secs:
+            return None
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _save_cached(cache_path: Path, docs: list[Document]) -> None:
+    """
+    Атомарно сохраняет документы в кэш (файлы могут парситься в нескольких процессах).
+    Кэш - необязательная оптимизация: если записать не удалось (нет прав, диск заполнен и т.п.),
+    ошибка только печатается, а результат парсинга не теряется
+    """
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(docs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pickle.PicklingError) as e:
+        print(f'{cache_path}: не удалось сохранить кэш: {e}')
+        tmp_path.unlink(missing_ok=True)
+
+
+def _has_content(doc: Document) -> bool:
+    """Есть ли в документе текст, кроме пробельных символов"""
+    return bool(doc.page_content and doc.page_content.strip())
+
+
+def _set_metadata(doc: Document, document_path: Path) -> Document:
+    """Проставляет метаданные об исходном файле"""
+    doc.metadata["source"] = document_path.name
+    doc.metadata["source_path"] = str(document_path)
+    doc.metadata["type"] = str(doc.__class__.__name__)
+    return doc
+
+
+def parse_document(document_path: str | Path, use_cache: bool = False, cache_namespace: str = "default",
+                   cache_ttl_secs: float | None = None, **kwargs) -> list[Document] | Exception:
     """
     document_path - путь к документу
+    use_cache - использовать ли кэш на диске в CACHE_DIR (ключ - хэш содержимого файла). По умолчанию выключен
+    cache_namespace - подкаталог кэша, позволяет держать раздельные кэши
+    cache_ttl_secs - время жизни записи кэша в секундах (None - бессрочно)
+    kwargs - аргументы для get_document_loader (mode, include_page_breaks, pdf_strategy, ocr_dpi)
 
     Возвращает список документов
     """
     try:
-        document_path = Path(document_path, **kwargs)
+        document_path = Path(document_path)
+        kwargs.setdefault("mode", DEFAULT_MODE)  # режим входит в ключ кэша
+
+        loader = get_document_loader(document_path, **kwargs)
+        if isinstance(loader, Exception):
+            raise loader
 
-        loader = get_document_loader(document_path)
+        docs = None
+        if use_cache:
+            cache_path = CACHE_DIR / cache_namespace / f"{_file_hash(document_path, **kwargs)}.pkl"
+            docs = _load_cached(cache_path, cache_ttl_secs)
 
-        for doc in loader.load():
-            doc.metadata["source"] = document_path.name
-            doc.metadata["source_path"] = str(document_path)
-            doc.metadata["type"] = str(doc.__class__.__name__)
+        if docs is None:
+            docs = loader.load()  # парсим один раз, load() - самая дорогая часть (OCR, layout)
 
-        return loader.load()
+            # Пустые документы (например, страницы сканов без распознанного текста) дальше не нужны
+            parsed_count = len(docs)
+            docs = [doc for doc in docs if _has_content(doc)]
+            if len(docs) < parsed_count:
+                print(f'{document_path}: пропущено пустых документов: {parsed_count - len(docs)}')
+
+            if use_cache:
+                _save_cached(cache_path, docs)
+
+        return [_set_metadata(doc, document_path) for doc in docs]
 
     except Exception as e:
         print(f'{document_path} ParseError: {e}')
         return e
 
 
+def iter_document(document_path: str | Path, **kwargs) -> Iterator[Document]:
+    """
+    document_path - путь к документу
+    kwargs - аргументы для get_document_loader (mode, include_page_breaks, pdf_strategy, ocr_dpi)
+
+    Потоковый вариант parse_document без кэша: отдаёт Document (по умолчанию - страницы) по мере разбора.
+    Для PDF со стратегией TESSERACT_STRATEGY страницы отдаются по одной, как только извлечены/распознаны;
+    стратегии Unstructured и режим 'single' собирают документ целиком. Ошибки парсинга пробрасываются
+    """
+    document_path = Path(document_path)
+
+    loader = get_document_loader(document_path, **kwargs)
+    if isinstance(loader, Exception):
+        raise loader
+
+    skipped = 0
+    for doc in loader.lazy_load():
+        if not _has_content(doc):
+            skipped += 1
+            continue
+        yield _set_metadata(doc, document_path)
+
+    if skipped:
+        print(f'{document_path}: пропущено пустых документов: {skipped}')
+
+
 def parse_documents_in_dir(
         dir_path: str | Path,
         recursive: bool = True,
         **kwargs,
-) -> list[Document] | Exception:
+) -> Iterator[Document]:
     """
     Парсинг файлов в указанной директории и всех вложенных директориях.
+    Документы отдаются по мере готовности, поэтому в памяти не держится вся директория целиком
+    и следующий этап (чанкинг, эмбеддинг) может работать параллельно с парсингом.
 
     Args:
         dir_path (str | Path): Путь к директории с файлами.
         recursive (bool): Производить ли рекурсивный поиск вложенных директорий.
         **kwargs: Дополнительные аргументы для функции парсинга.
 
+    Yields:
+        Document: Распарсенные документы в порядке следования файлов.
+    """
+    dir_path = Path(dir_path)
+
+    # Рекурсивно ищем во всех вложенных директориях, сразу отбрасывая неподдерживаемые форматы
+    files = list(_iter_document_files(dir_path, recursive)) if dir_path.is_dir() else []
+
+    workers = _get_parse_workers()
+    parse = functools.partial(parse_document, **kwargs)
+
+    # Парсинг CPU-bound (layout, OCR, XML), поэтому раскидываем файлы по процессам.
+    # В работе держим не больше 2 * workers файлов, чтобы готовые результаты не копились в памяти
+    pool = ProcessPoolExecutor(max_workers=workers)
+    finished = False
+    try:
+        with tqdm(total=len(files)) as progress:
+            pending: deque[Future] = deque()
+            files_iter = iter(files)
+
+            for path in itertools.islice(files_iter, 2 * workers):
+                pending.append(pool.submit(parse, path))
+
+            while pending:
+                docs = pending.popleft().result()
+                next_path = next(files_iter, None)
+                if next_path is not None:
+                    pending.append(pool.submit(parse, next_path))
+
+                progress.update()
+                if docs and not isinstance(docs, Exception):
+                    yield from docs
+        finished = True
+    finally:
+        # Если потребитель остановил итерацию раньше - отменяем очередь и не ждём уже запущенные парсинги
+        pool.shutdown(wait=finished, cancel_futures=True)
+
+
+def parse_documents_in_dir_list(
+        dir_path: str | Path,
+        recursive: bool = True,
+        **kwargs,
+) -> list[Document] | Exception:
+    """
+    То же, что parse_documents_in_dir, но собирает все документы в список.
+
+    Returns:
+        list[Document] | Exception: Список объектов Document, если найдены файлы и успешно распарсены, иначе Exception.
+    """
+    out = list(parse_documents_in_dir(dir_path, recursive=recursive, **kwargs))
+
+    # Возвращаем список документов, если он не пустой, иначе сообщение об ошибке
+    return out if out else Exception(f"Неверный путь: {dir_path}")
+
+
+async def aparse_documents_in_dir(
+        dir_path: str | Path,
+        recursive: bool = True,
+        max_concurrency: int | None = None,
+        **kwargs,
+) -> list[Document] | Exception:
+    """
+    Асинхронный вариант parse_documents_in_dir.
+    Файлы парсятся в пуле процессов, кол-во одновременно обрабатываемых файлов ограничено семафором.
+
+    Args:
+        dir_path (str | Path): Путь к директории с файлами.
+        recursive (bool): Производить ли рекурсивный поиск вложенных директорий.
+        max_concurrency (int | None): Максимум одновременно парсящихся файлов (по умолчанию = кол-ву процессов).
+        **kwargs: Дополнительные аргументы для функции парсинга.
+
     Returns:
         list[Document] | Exception: Список объектов Document, если найдены файлы и успешно распарсены, иначе Exception.
     """
     dir_path = Path(dir_path)
 
+    files = list(_iter_document_files(dir_path, recursive)) if dir_path.is_dir() else []
+
+    workers = _get_parse_workers()
+    semaphore = asyncio.Semaphore(max_concurrency or workers)
+    loop = asyncio.get_running_loop()
+    parse = functools.partial(parse_document, **kwargs)
+
     out: list[Document] = []
 
-    for doc in tqdm(dir_path.glob('**/*' if recursive else '*')):  # Рекурсивно ищем во всех вложенных директориях
-        docs = parse_document(doc, **kwargs)
-        if docs:
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async def _parse_one(path: Path) -> list[Document] | Exception:
+            async with semaphore:
+                return await loop.run_in_executor(pool, parse, path)
+
+        results = await asyncio.gather(*(_parse_one(f) for f in files))
+
+    for docs in results:
+        if docs and not isinstance(docs, Exception):
             out.extend(docs)
 
-    # Возвращаем список документов, если он не пустой, иначе сообщение об ошибке
     return out if out else Exception(f"Неверный путь: {dir_path}")
 
 # тест
@@ -1,6 +1,8 @@
 from telethon import TelegramClient
 
 from dotenv import load_dotenv
+import asyncio
+import json
 import os
 
 from langchain.schema import Document
@@ -18,42 +20,111 @@ api_hash = os.getenv('TEL_API_HASH')
 phone = os.getenv('TEL_ACC_NUMBER')
 
 
+# Максимум одновременно выкачиваемых чатов, чтобы не словить FloodWait
+MAX_CONCURRENT_CHATS = 8
+
+
+def _message_to_document(msg, chat: str) -> Document:
+    """
+    Преобразует сообщение Telethon в Document
+    """
+    text = msg.text if msg.text is not None else ""
+    return Document(
+        page_content=text,
+        metadata={
+            "source": msg.sender_id,
+            "source_path": chat,
+            "message_id": msg.id,
+            "date": str(msg.date),
+            "type": str(msg.media.__class__.__name__) if msg.media else "text"
+        }
+    )
+
+
+def _load_state(state_path: Path) -> dict[str, int]:
+    """
+    Читает состояние инкрементальной выгрузки: чат -> id последнего полученного сообщения
+    """
+    try:
+        return json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state_path: Path, state: dict[str, int]) -> None:
+    """
+    Атомарно сохраняет состояние инкрементальной выгрузки
+    """
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_name(f"{state_path.name}.tmp")
+    tmp_path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, state_path)
+
+
 async def get_messages_from_chats(client: TelegramClient, chats: list[str],
-                                  messages_limit: int = 1000) -> list[Document]:
+                                  messages_limit: int = 1000, state_path: Path | None = None) -> list[Document]:
     """
     chats - список чатов @username или id
     messages_limit - кол-во сообщений
+    state_path - json с id последнего полученного сообщения по каждому чату.
+                 Если задан, выкачиваются только сообщения новее сохранённых, а состояние обновляется
+                 (не больше messages_limit за запуск, от старых к новым; остаток докачается в следующий раз)
 
     Возвращает список документов
     !!! Важно. Список докуметов имеет тип не только text. При загрузке в БД нужно фильтровать
     """
-    docs = []
-    for chat in chats:
-        async for msg in tqdm(client.iter_messages(chat, limit=messages_limit)):
-            text = msg.text if msg.text is not None else ""
-            docs.append(
-                Document(
-                    page_content=text,
-                    metadata={
-                        "source": msg.sender_id,
-                        "source_path": chat,
-                        "message_id": msg.id,
-                        "date": str(msg.date),
-                        "type": str(msg.media.__class__.__name__) if msg.media else "text"
-                    }
-                )
-            )
-    return docs
-
-def parse_telegram_chats(chats: list, messages_limit: int = 1000) -> list[Document]:
+    state = _load_state(Path(state_path)) if state_path is not None else {}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHATS)
+    progress = tqdm(unit="msg")
+    skipped = 0
+
+    async def _fetch_one(chat: str) -> list[Document]:
+        nonlocal skipped
+        key = str(chat)
+        async with semaphore:
+            chat_docs = []
+            last_id = state.get(key, 0)
+            # Продолжая с сохранённого id, идём от старых к новым: если новых сообщений больше messages_limit,
+            # следующий запуск докачает остаток, а не пропустит разрыв между last_id и самыми свежими
+            async for msg in client.iter_messages(chat, limit=messages_limit, min_id=last_id,
+                                                  reverse=bool(last_id), wait_time=0):
+                state[key] = max(msg.id, state.get(key, 0))
+                progress.update()
+                # Пустые сообщения без вложений (служебные и т.п.) в БД не нужны
+                if not msg.text and msg.media is None:
+                    skipped += 1
+                    continue
+                chat_docs.append(_message_to_document(msg, chat))
+            return chat_docs
+
+    # Чаты независимы, качаем их параллельно. gather сохраняет порядок чатов
+    results = await asyncio.gather(*(_fetch_one(chat) for chat in chats))
+    progress.close()
+
+    if skipped:
+        print(f'Пропущено пустых сообщений: {skipped}')
+
+    if state_path is not None:
+        _save_state(Path(state_path), state)
+
+    return [doc for chat_docs in results for doc in chat_docs]
+
+async def aparse_telegram_chats(chats: list, messages_limit: int = 1000,
+                                state_path: Path | None = None) -> list[Document]:
+    """
+    Асинхронная обёртка: создаёт клиента в текущем event loop, получает сообщения, возвращает список Document.
+    Можно запускать вместе с другими корутинами (например, через asyncio.gather).
+    """
+    async with TelegramClient("session_name", api_id, api_hash) as client:
+        return await get_messages_from_chats(client, chats=chats, messages_limit=messages_limit,
+                                             state_path=state_path)
+
+
+def parse_telegram_chats(chats: list, messages_limit: int = 1000, state_path: Path | None = None) -> list[Document]:
     """
     Обёртка: создаёт клиента, получает сообщения, возвращает список Document.
     """
-    with TelegramClient("session_name", api_id, api_hash) as client:
-        docs = client.loop.run_until_complete(
-            get_messages_from_chats(client, chats=chats, messages_limit=messages_limit)
-        )
-    return docs
+    return asyncio.run(aparse_telegram_chats(chats, messages_limit=messages_limit, state_path=state_path))
 
 # тест
 if __name__ == "__main__":
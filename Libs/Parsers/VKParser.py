@@ -11,6 +11,7 @@ VKParser: извлечение истории сообщений из личны
 - Для чтения ЛИЧНЫХ сообщений нужен **user access token** с правами: messages, offline.
 - Для чтения сообщений СООБЩЕСТВА используйте **group access token** с правами messages; будут доступны только диалоги этого сообщества.
 - Максимум 200 сообщений за один вызов messages.getHistory — используем цикл с offset.
+  Вызовы getHistory пакуются по 25 штук в один запрос через метод execute.
 - Для бесед peer_id = 2000000000 + chat_id. Для пользователей peer_id = user_id.
 - Резолвинг screen name ограниченно поддержан (только пользователи/сообщества); для бесед передавайте integer peer_id напрямую.
 
@@ -24,9 +25,16 @@ VKParser: извлечение истории сообщений из личны
 
 from __future__ import annotations
 
+import functools
+import hashlib
+import json
 import os
+import sys
+import threading
 import time
-from typing import Iterable, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Dict, Any, Tuple
 
 from pathlib import Path
 from dotenv import load_dotenv
@@ -44,9 +52,23 @@ load_dotenv(dotenv_path=ENV_PATH)
 
 # --- Внутренние утилиты ---
 
+@functools.lru_cache(maxsize=4)
+def _vk_client_for_token(token: str) -> vk_api.VkApi:
+    """Один VkApi на токен на весь процесс.
+
+    VkApi держит внутри requests.Session, поэтому повторные вызовы переиспользуют
+    keep-alive соединение вместо нового TLS-рукопожатия.
+    Встроенная задержка VkApi (RPS_DELAY) отключена: она отсчитывается от получения предыдущего ответа,
+    поэтому время самого запроса в интервал не засчитывается. Темп запросов задаёт _rate_limiter.
+    """
+    vk_session = vk_api.VkApi(token=token)
+    vk_session.RPS_DELAY = 0
+    return vk_session
+
+
 def _build_vk_client(mode: str = "user", user_token: str | None = None,
                      group_token: str | None = None) -> vk_api.VkApi:
-    """Создаёт VK API клиент.
+    """Создаёт VK API клиент (или возвращает уже созданный для этого токена).
 
     Args:
         mode: "user" или "group". Определяет, какой токен использовать.
@@ -54,7 +76,7 @@ def _build_vk_client(mode: str = "user", user_token: str | None = None,
         group_token: Явно переданный group access token (если None — берём из VK_GROUP_TOKEN).
 
     Returns:
-        vk_api.VkApi с авторизацией по токену.
+        vk_api.VkApi с авторизацией по токену. Для одного токена всегда один и тот же объект.
     """
     mode = mode.lower().strip()
     if mode not in {"user", "group"}:
@@ -70,12 +92,56 @@ def _build_vk_client(mode: str = "user", user_token: str | None = None,
             f"{'VK_USER_TOKEN' if mode == 'user' else 'VK_GROUP_TOKEN'}."
         )
 
-    return vk_api.VkApi(token=token)
+    return _vk_client_for_token(token)
+
+
+# Кэш screen name -> id, переживает перезапуски. Каталог можно переопределить через RAGNESTIOR_CACHE_DIR
+SCREEN_NAMES_CACHE_PATH = (Path(os.environ.get("RAGNESTIOR_CACHE_DIR", Path.home() / ".cache" / "ragnestior"))
+                           / "vk_names.json")
+
+# "<хэш токена>:<screen name>" -> id; загружается с диска при первом обращении
+_screen_names: Dict[str, int] | None = None
+
+
+def _token_key(vk_session: vk_api.VkApi) -> str:
+    """Короткий хэш токена сессии: ключ кэша без хранения самого токена на диске."""
+    token = (getattr(vk_session, "token", None) or {}).get("access_token") or ""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def _load_screen_names() -> Dict[str, int]:
+    """Кэш screen name, при первом обращении читается с диска."""
+    global _screen_names
+    if _screen_names is None:
+        try:
+            _screen_names = json.loads(SCREEN_NAMES_CACHE_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _screen_names = {}
+    return _screen_names
+
+
+def _save_screen_names() -> None:
+    """Атомарно сохраняет кэш screen name на диск.
+
+    Сохранение - только оптимизация для следующих запусков: если записать не удалось (нет прав,
+    read-only HOME, диск заполнен), ошибка печатается, а кэш в памяти продолжает работать.
+    """
+    tmp_path = SCREEN_NAMES_CACHE_PATH.with_name(f"{SCREEN_NAMES_CACHE_PATH.name}.{os.getpid()}.tmp")
+    try:
+        SCREEN_NAMES_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(_load_screen_names(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, SCREEN_NAMES_CACHE_PATH)
+    except OSError as e:
+        print(f"Не удалось сохранить кэш screen name в {SCREEN_NAMES_CACHE_PATH}: {e}")
+        tmp_path.unlink(missing_ok=True)
 
 
-def _resolve_screen_name(vk: vk_api.VkApiMethod, name: str) -> int | None:
+def _resolve_screen_name(vk: vk_api.VkApiMethod, name: str, token_key: str = "") -> int | None:
     """Пытается резолвить screen name (vk.com/xxxx или просто 'xxxx') в id.
 
+    Успешные результаты кэшируются (в памяти и в SCREEN_NAMES_CACHE_PATH) по ключу (token_key, name):
+    соответствие screen name -> id практически не меняется, а каждый запрос расходует rate limit.
+
     Возвращает:
         positive int user_id / group_id (для групп возвращает отрицательный id в VK стандарте не нужен,
         но для peer_id лички с группой он не применяется), либо None если не удалось.
@@ -85,20 +151,33 @@ def _resolve_screen_name(vk: vk_api.VkApiMethod, name: str) -> int | None:
     name = name.strip()
     if name.startswith("https://vk.com/"):
         name = name.rsplit("/", 1)[-1]
+
+    cache = _load_screen_names()
+    cache_key = f"{token_key}:{name}"
+    if cache_key in cache:
+        return cache[cache_key]
+
+    resolved = None
     try:
+        _rate_limiter.acquire()
         data = vk.utils.resolveScreenName(screen_name=name)
         if not data:
             return None
         if data.get("type") == "user":
-            return int(data["object_id"])  # user_id
-        if data.get("type") == "group":
-            return -int(data["object_id"])  # группы обычно как отрицательные owner_id; для peer_id лички это не применяется
+            resolved = int(data["object_id"])  # user_id
+        elif data.get("type") == "group":
+            resolved = -int(data["object_id"])  # группы обычно как отрицательные owner_id; для peer_id лички это не применяется
     except Exception:
         return None
-    return None
 
+    # Неудачи не кэшируем: они могут быть временными (сеть, лимиты)
+    if resolved is not None:
+        cache[cache_key] = resolved
+        _save_screen_names()
+    return resolved
 
-def _normalize_peer_ids(vk: vk_api.VkApiMethod, peer_ids: Iterable[int | str]) -> List[int]:
+
+def _normalize_peer_ids(vk: vk_api.VkApiMethod, peer_ids: Iterable[int | str], token_key: str = "") -> List[int]:
     """Приводит входные идентификаторы к integer peer_id.
 
     Поддерживает:
@@ -106,6 +185,7 @@ def _normalize_peer_ids(vk: vk_api.VkApiMethod, peer_ids: Iterable[int | str]) -
         - 'https://vk.com/username' или 'username' (только для пользователей/сообществ → вернёт user_id; для бесед не сработает)
 
     Для бесед передавайте сразу integer: 2000000000 + chat_id.
+    token_key - ключ токена для кэша screen name (см. _token_key).
     """
     out: List[int] = []
     for pid in peer_ids:
@@ -113,7 +193,7 @@ def _normalize_peer_ids(vk: vk_api.VkApiMethod, peer_ids: Iterable[int | str]) -
             out.append(pid)
             continue
         # строка: попробуем резолвить как screen name
-        resolved = _resolve_screen_name(vk, pid)
+        resolved = _resolve_screen_name(vk, pid, token_key=token_key)
         if resolved is None:
             raise ValueError(f"Не удалось распознать peer_id из '{pid}'. Для бесед передавайте целочисленный peer_id.")
         # Для пользователей peer_id == user_id (положительный). Для групп личных сообщений peer_id == -group_id не используется.
@@ -128,38 +208,143 @@ def _normalize_peer_ids(vk: vk_api.VkApiMethod, peer_ids: Iterable[int | str]) -
     return out
 
 
-def _fetch_history(vk: vk_api.VkApiMethod, peer_id: int, limit: int = 1000, pause: float = 0.34) -> List[Dict[str, Any]]:
-    """Тянет историю сообщений по peer_id с пагинацией.
+class _RateLimiter:
+    """Потокобезопасный ограничитель темпа запросов по дедлайнам.
+
+    Каждый запрос получает свой слот не раньше чем через interval после предыдущего и ждёт только
+    оставшийся до слота промежуток: если сам HTTP-запрос занял больше interval, ждать не нужно вовсе.
+    В отличие от token bucket не даёт всплеска в начале, поэтому в любом окне в 1 секунду не больше ~3 запросов.
+    """
+
+    def __init__(self, interval: float = 0.34):
+        self.interval = interval
+        self._next_allowed = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Блокирует поток до его слота."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed)
+            self._next_allowed = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Общий на весь процесс: лимит VK (не больше 3 запросов в секунду) считается на токен, а не на вызов функции
+_rate_limiter = _RateLimiter()
+
+
+# Максимум вызовов API внутри одного execute (ограничение VK)
+EXECUTE_MAX_CALLS = 25
+# Максимум сообщений за один messages.getHistory
+HISTORY_MAX_COUNT = 200
 
-    Args:
-        vk: vk_session.get_api()
-        peer_id: целевой диалог (личка или беседа). Для беседы: 2000000000 + chat_id.
-        limit: максимум сообщений, которые хотим получить.
-        pause: задержка между запросами, чтобы не уткнуться в rate limit (~3 rps).
+
+def _history_calls(peer_id: int, limit: int) -> List[Dict[str, int]]:
+    """Разбивает выкачку limit сообщений диалога на параметры отдельных вызовов messages.getHistory."""
+    return [
+        {"peer_id": peer_id, "count": min(HISTORY_MAX_COUNT, limit - offset), "offset": offset}
+        for offset in range(0, limit, HISTORY_MAX_COUNT)
+    ]
+
+
+def _execute_history_calls(vk: vk_api.VkApiMethod, calls: List[Dict[str, int]]) -> List[List[Dict[str, Any]]]:
+    """Выполняет до EXECUTE_MAX_CALLS вызовов messages.getHistory одним запросом через метод execute.
+
+    Неудачный вызов внутри execute возвращается как false (ошибка уходит в execute_errors). Такой вызов
+    повторяется отдельным messages.getHistory, чтобы ошибка (например, нет доступа к диалогу) поднялась
+    как vk_api.ApiError, а не обрезала историю молча.
 
     Returns:
-        Список "сырых" сообщений (dict), в порядке от новых к старым (как возвращает VK).
+        Списки сообщений (items) для каждого вызова, в том же порядке.
     """
-    items: List[Dict[str, Any]] = []
-    got = 0
-    offset = 0
-    per_call = 200 if limit > 200 else limit
-
-    while got < limit:
-        count = min(per_call, limit - got)
-        resp = vk.messages.getHistory(peer_id=peer_id, count=count, offset=offset)
-        batch = resp.get("items", [])
-        if not batch:
-            break
-        items.extend(batch)
-        got += len(batch)
-        offset += len(batch)
-        time.sleep(pause)
-        if len(batch) < count:
-            break  # дошли до конца истории
+    code = "return [" + ",".join(f"API.messages.getHistory({json.dumps(c)})" for c in calls) + "];"
+    responses = vk.execute(code=code)
+    if not isinstance(responses, list) or len(responses) != len(calls):
+        raise RuntimeError(
+            f"execute вернул {len(responses) if isinstance(responses, list) else responses!r} ответов "
+            f"вместо {len(calls)}"
+        )
+
+    items: List[List[Dict[str, Any]]] = []
+    for call, resp in zip(calls, responses):
+        if not isinstance(resp, dict):
+            _rate_limiter.acquire()
+            resp = vk.messages.getHistory(**call)
+        items.append(resp.get("items", []))
     return items
 
 
+def _iter_histories(vk: vk_api.VkApiMethod, peer_ids: Iterable[int],
+                    limit: int = 1000) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """Тянет историю сообщений сразу по нескольким диалогам, отдавая каждый диалог, как только он скачан.
+
+    Вызовы messages.getHistory всех диалогов упаковываются по EXECUTE_MAX_CALLS штук в один execute,
+    т.е. один HTTP-запрос вместо 25. Сами execute-запросы идут последовательно: VkApi.method держит
+    блокировку на время HTTP-запроса, так что потоки над одной сессией всё равно не перекрывались бы.
+    Темп ограничивается _rate_limiter (~3 rps), ждём только остаток интервала.
+
+    Args:
+        vk: vk_session.get_api()
+        peer_ids: целевые диалоги (личка или беседа). Для беседы: 2000000000 + chat_id.
+        limit: максимум сообщений, которые хотим получить из каждого диалога.
+
+    Yields:
+        (peer_id, список "сырых" сообщений (dict) в порядке от новых к старым, как возвращает VK).
+        Диалоги отдаются в порядке peer_ids.
+    """
+    histories: Dict[int, List[Dict[str, Any]]] = {}
+    calls: List[Dict[str, int]] = []
+    for pid in dict.fromkeys(peer_ids):  # без дублей, порядок сохраняется
+        histories[pid] = []
+        calls.extend(_history_calls(pid, limit))
+
+    chunks = [calls[start:start + EXECUTE_MAX_CALLS] for start in range(0, len(calls), EXECUTE_MAX_CALLS)]
+
+    # Номер execute-запроса с последней страницей диалога: после него история диалога полная
+    last_chunk: Dict[int, int] = {}
+    for idx, chunk in enumerate(chunks):
+        for call in chunk:
+            last_chunk[call["peer_id"]] = idx
+
+    for pid in list(histories):
+        if pid not in last_chunk:  # limit == 0, запрашивать нечего
+            yield pid, histories.pop(pid)
+
+    finished: set[int] = set()  # диалоги, история которых уже закончилась
+    for idx, chunk in enumerate(chunks):
+        _rate_limiter.acquire()
+        batches = _execute_history_calls(vk, chunk)
+        for call, batch in zip(chunk, batches):
+            pid = call["peer_id"]
+            if pid in finished:
+                continue
+            histories[pid].extend(batch)
+            if len(batch) < call["count"]:
+                finished.add(pid)  # дошли до конца истории
+
+        for call in chunk:
+            pid = call["peer_id"]
+            if last_chunk[pid] == idx and pid in histories:
+                yield pid, histories.pop(pid)
+
+
+# Общий пустой кортеж для сообщений без вложений, чтобы не создавать его на каждое сообщение
+_EMPTY_ATTACHMENTS: tuple[str, ...] = ()
+
+
+_get_type = itemgetter("type")
+
+
+def _attachment_types(attachments: List[Dict[str, Any]]) -> tuple[str, ...]:
+    """Типы вложений сообщения. map + itemgetter работают на уровне C, без Python-цикла на каждый элемент."""
+    try:
+        return tuple(map(sys.intern, map(_get_type, attachments)))
+    except KeyError:  # у вложения нет поля type - редкий случай, идём медленным путём
+        return tuple(sys.intern(att.get("type", "unknown")) for att in attachments)
+
+
 def _vk_message_to_document(msg: Dict[str, Any], peer_id: int) -> Document:
     """Преобразует vk message dict в LangChain Document.
 
@@ -168,9 +353,10 @@ def _vk_message_to_document(msg: Dict[str, Any], peer_id: int) -> Document:
     text = msg.get("text") or ""
 
     # Краткая сводка вложений (без скачивания)
-    attachments = msg.get("attachments") or []
-    att_summ = [att.get("type", "unknown") for att in attachments]
+    attachments = msg.get("attachments")
+    att_summ = _attachment_types(attachments) if attachments else _EMPTY_ATTACHMENTS
 
+    # Ключи и "vk" - строковые константы-идентификаторы, компилятор их уже интернирует: у всех Document они общие
     metadata = {
         "platform": "vk",
         "peer_id": peer_id,
@@ -183,6 +369,11 @@ def _vk_message_to_document(msg: Dict[str, Any], peer_id: int) -> Document:
     return Document(page_content=text, metadata=metadata)
 
 
+def _batch_to_documents(raw_msgs: List[Dict[str, Any]], peer_id: int) -> List[Document]:
+    """Преобразует историю одного диалога в список Document."""
+    return [_vk_message_to_document(m, peer_id) for m in raw_msgs]
+
+
 def get_messages_from_vk(
     vk_session: vk_api.VkApi,
     peer_ids: Iterable[int | str],
@@ -202,13 +393,17 @@ def get_messages_from_vk(
     vk = vk_session.get_api()
 
     # Нормализуем peer_ids
-    normalized_peers = _normalize_peer_ids(vk, peer_ids)
-
-    docs: List[Document] = []
-    for pid in normalized_peers:
-        raw_msgs = _fetch_history(vk, pid, limit=limit_per_dialog)
-        for m in raw_msgs:
-            docs.append(_vk_message_to_document(m, pid))
+    normalized_peers = _normalize_peer_ids(vk, peer_ids, token_key=_token_key(vk_session))
+
+    # Документы собираем в отдельных потоках, пока качаются следующие диалоги
+    with ThreadPoolExecutor(max_workers=2) as cpu_pool:
+        doc_futures = [
+            cpu_pool.submit(_batch_to_documents, raw_msgs, pid)
+            for pid, raw_msgs in _iter_histories(vk, normalized_peers, limit=limit_per_dialog)
+        ]
+        docs: List[Document] = []
+        for fut in doc_futures:
+            docs.extend(fut.result())
     return docs
 
 